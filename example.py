@@ -5,17 +5,19 @@ MHTML解析器使用示例
 演示如何使用mhtml_parser模块解析聊天记录
 """
 
-from mhtml_parser import MHTMLParser, ChatSession, ChatMessage
-import json
+from mhtml_parser import MHTMLParser, ChatSession, ChatMessage, write_json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Optional
 
 
-def basic_example():
+def basic_example(parser: Optional[MHTMLParser] = None):
     """基本使用示例"""
     print("=== 基本使用示例 ===")
 
-    # 创建解析器实例
-    parser = MHTMLParser()
+    # 创建解析器实例（传入共享实例时可复用其解析缓存）
+    parser = parser or MHTMLParser()
 
     # 解析文件（请替换为你的MHTML文件路径）
     file_path = "D:\\Downloads\\12345.mhtml"  # 示例文件路径
@@ -30,11 +32,10 @@ def basic_example():
         print(f"⏰ 创建时间: {session.created_time}")
         print(f"💬 消息总数: {len(session.messages)}")
 
-        # 显示消息分布
-        user_count = sum(1 for msg in session.messages if msg.sender == 'user')
-        ai_count = sum(1 for msg in session.messages if msg.sender == 'assistant')
-        print(f"   - 用户消息: {user_count}")
-        print(f"   - AI回复: {ai_count}")
+        # 显示消息分布（直接在发送者列上计数）
+        senders = session.senders
+        print(f"   - 用户消息: {senders.count('user')}")
+        print(f"   - AI回复: {senders.count('assistant')}")
 
         # 显示前几条消息的预览
         print("\\n📝 消息预览:")
@@ -50,11 +51,11 @@ def basic_example():
         print(f"❌ 解析失败: {e}")
 
 
-def export_example():
+def export_example(parser: Optional[MHTMLParser] = None):
     """导出功能示例"""
     print("\\n=== 导出功能示例 ===")
 
-    parser = MHTMLParser()
+    parser = parser or MHTMLParser()
     file_path = "D:\\Downloads\\12345.mhtml"
 
     try:
@@ -79,71 +80,87 @@ def export_example():
         print(f"❌ 导出失败: {e}")
 
 
-def filter_example():
+def filter_example(parser: Optional[MHTMLParser] = None):
     """内容过滤示例"""
     print("\\n=== 内容过滤示例 ===")
 
-    parser = MHTMLParser()
+    parser = parser or MHTMLParser()
     file_path = "D:\\Downloads\\12345.mhtml"
 
     try:
         session = parser.parse_mhtml_file(file_path)
 
-        # 按发送者分类
-        user_messages = [msg for msg in session.messages if msg.sender == 'user']
-        ai_messages = [msg for msg in session.messages if msg.sender == 'assistant']
+        # 按列取出消息字段（每次访问属性都会重新计算，先保存下来）
+        senders = session.senders
+        contents = session.contents
+        lengths = session.lengths
 
-        print(f"👥 用户消息数: {len(user_messages)}")
-        print(f"🤖 AI消息数: {len(ai_messages)}")
+        # 按发送者分类
+        print(f"👥 用户消息数: {senders.count('user')}")
+        print(f"🤖 AI消息数: {senders.count('assistant')}")
 
         # 查找关键词
         keywords = ['游戏', '设计', '开发', '版本']
         for keyword in keywords:
-            matching_messages = [msg for msg in session.messages if keyword in msg.content]
-            print(f"🔍 包含'{keyword}'的消息: {len(matching_messages)}")
+            matching_count = sum(keyword in content for content in contents)
+            print(f"🔍 包含'{keyword}'的消息: {matching_count}")
 
         # 查找最长的消息
-        if session.messages:
-            longest_msg = max(session.messages, key=lambda x: len(x.content))
-            print(f"📏 最长消息: {len(longest_msg.content)} 字符 (来自 {longest_msg.sender})")
+        if lengths:
+            longest_length = max(lengths)
+            longest_sender = senders[lengths.index(longest_length)]
+            print(f"📏 最长消息: {longest_length} 字符 (来自 {longest_sender})")
 
         # 查找包含思考过程的消息
-        thinking_messages = [msg for msg in session.messages if msg.thinking]
-        print(f"🧠 包含思考过程的消息: {len(thinking_messages)}")
+        thinking_count = sum(map(bool, session.thinkings))
+        print(f"🧠 包含思考过程的消息: {thinking_count}")
 
     except Exception as e:
         print(f"❌ 过滤失败: {e}")
 
 
-def custom_processing_example():
+def custom_processing_example(parser: Optional[MHTMLParser] = None):
     """自定义处理示例"""
     print("\\n=== 自定义处理示例 ===")
 
-    parser = MHTMLParser()
+    parser = parser or MHTMLParser()
     file_path = "D:\\Downloads\\12345.mhtml"
 
     try:
         session = parser.parse_mhtml_file(file_path)
 
-        # 生成对话统计报告
+        # 一次遍历同时生成统计数据和简化版对话记录
         stats = {
             'total_messages': len(session.messages),
-            'total_characters': sum(len(msg.content) for msg in session.messages),
+            'total_characters': 0,
             'avg_message_length': 0,
             'user_messages': 0,
             'ai_messages': 0,
             'messages_with_thinking': 0
         }
+        simplified_messages = []
+
+        for msg in session.messages:
+            length = len(msg.content)
+            stats['total_characters'] += length
+            if msg.sender == 'user':
+                stats['user_messages'] += 1
+            elif msg.sender == 'assistant':
+                stats['ai_messages'] += 1
+            if msg.thinking:
+                stats['messages_with_thinking'] += 1
+
+            simplified_messages.append({
+                'role': msg.sender,
+                'content': msg.content[:500],  # 只保留前500字符
+                'length': length
+            })
 
         if session.messages:
             stats['avg_message_length'] = stats['total_characters'] / stats['total_messages']
-            stats['user_messages'] = sum(1 for msg in session.messages if msg.sender == 'user')
-            stats['ai_messages'] = sum(1 for msg in session.messages if msg.sender == 'assistant')
-            stats['messages_with_thinking'] = sum(1 for msg in session.messages if msg.thinking)
 
         # 保存统计报告
-        with open('chat_stats.json', 'w', encoding='utf-8') as f:
-            json.dump(stats, f, ensure_ascii=False, indent=2)
+        write_json(stats, 'chat_stats.json')
 
         print("📊 对话统计报告:")
         for key, value in stats.items():
@@ -154,17 +171,8 @@ def custom_processing_example():
 
         print("✅ 统计报告已保存到: chat_stats.json")
 
-        # 创建简化版本的对话记录
-        simplified_messages = []
-        for msg in session.messages:
-            simplified_messages.append({
-                'role': msg.sender,
-                'content': msg.content[:500],  # 只保留前500字符
-                'length': len(msg.content)
-            })
-
-        with open('chat_simplified.json', 'w', encoding='utf-8') as f:
-            json.dump(simplified_messages, f, ensure_ascii=False, indent=2)
+        # 保存简化版本的对话记录
+        write_json(simplified_messages, 'chat_simplified.json')
 
         print("✅ 简化版对话已保存到: chat_simplified.json")
 
@@ -172,6 +180,44 @@ def custom_processing_example():
         print(f"❌ 自定义处理失败: {e}")
 
 
+def _process_one(file_path: str) -> dict:
+    """处理单个MHTML文件（顶层函数，可被进程池序列化）"""
+    try:
+        if not Path(file_path).exists():
+            print(f"⚠️  文件不存在: {file_path}")
+            return {
+                'file': Path(file_path).name,
+                'status': 'file_not_found'
+            }
+
+        print(f"🔄 正在处理: {Path(file_path).name}")
+        parser = MHTMLParser()
+        session = parser.parse_mhtml_file(file_path)
+
+        result = {
+            'file': Path(file_path).name,
+            'title': session.title,
+            'message_count': len(session.messages),
+            'url': session.url,
+            'status': 'success'
+        }
+
+        # 导出每个文件
+        output_name = Path(file_path).stem
+        parser.export_to_markdown(session, f"{output_name}_export.md")
+
+        print(f"✅ 处理完成: {result['message_count']} 条消息")
+        return result
+
+    except Exception as e:
+        print(f"❌ 处理失败: {file_path} - {e}")
+        return {
+            'file': Path(file_path).name,
+            'status': 'error',
+            'error': str(e)
+        }
+
+
 def batch_processing_example():
     """批量处理示例"""
     print("\\n=== 批量处理示例 ===")
@@ -182,48 +228,12 @@ def batch_processing_example():
         # 可以添加更多文件路径
     ]
 
-    parser = MHTMLParser()
-    results = []
-
-    for file_path in mhtml_files:
-        try:
-            if Path(file_path).exists():
-                print(f"🔄 正在处理: {Path(file_path).name}")
-                session = parser.parse_mhtml_file(file_path)
-
-                result = {
-                    'file': Path(file_path).name,
-                    'title': session.title,
-                    'message_count': len(session.messages),
-                    'url': session.url,
-                    'status': 'success'
-                }
-
-                # 导出每个文件
-                output_name = Path(file_path).stem
-                parser.export_to_markdown(session, f"{output_name}_export.md")
-
-                results.append(result)
-                print(f"✅ 处理完成: {result['message_count']} 条消息")
-
-            else:
-                print(f"⚠️  文件不存在: {file_path}")
-                results.append({
-                    'file': Path(file_path).name,
-                    'status': 'file_not_found'
-                })
-
-        except Exception as e:
-            print(f"❌ 处理失败: {file_path} - {e}")
-            results.append({
-                'file': Path(file_path).name,
-                'status': 'error',
-                'error': str(e)
-            })
+    # 各文件相互独立，使用进程池并行解析（结果顺序与输入一致）
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        results = list(executor.map(_process_one, mhtml_files, chunksize=4))
 
     # 保存批量处理结果
-    with open('batch_processing_results.json', 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+    write_json(results, 'batch_processing_results.json')
 
     print(f"\\n📋 批量处理完成，共处理 {len(mhtml_files)} 个文件")
     success_count = sum(1 for r in results if r.get('status') == 'success')
@@ -237,11 +247,14 @@ def main():
     print("🚀 MHTML解析器使用示例")
     print("=" * 50)
 
+    # 共享同一个解析器，同一文件只解析一次，后续示例直接使用缓存结果
+    parser = MHTMLParser()
+
     # 运行各种示例
-    basic_example()
-    export_example()
-    filter_example()
-    custom_processing_example()
+    basic_example(parser)
+    export_example(parser)
+    filter_example(parser)
+    custom_processing_example(parser)
     batch_processing_example()
 
     print("\\n🎉 所有示例运行完成！")
@@ -10,27 +10,103 @@
 """
 
 import re
+import sys
 import email
 import email.message
+import email.parser
+import email.policy
 import quopri
 import urllib.parse
 from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 import json
 import html
+from array import array
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import datetime
 
-
-@dataclass
+try:
+    # 可选依赖：基于C的HTML解析器，安装后用于文本提取
+    from selectolax.lexbor import LexborHTMLParser as _HTMLParser
+except ImportError:
+    _HTMLParser = None
+
+try:
+    # 可选依赖：更快的JSON序列化，直接输出UTF-8字节
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
+
+
+# Python 3.10+ 的dataclass支持slots，去掉每个实例的__dict__以节省内存
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+# 每个解析器实例最多缓存的解析结果数
+_PARSE_CACHE_SIZE = 32
+
+# 文件读写缓冲区大小（128 KiB），远大于默认的8 KiB，减少系统调用次数
+_IO_BUF = 1 << 17
+
+# 脚本、样式等不可见内容块
+_INVISIBLE_BLOCK_RE = re.compile(r'<(script|style|svg)\b[^>]*>.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+# HTML标签
+_TAG_RE = re.compile(r'<[^>]+>')
+# 不可见内容的标签
+_INVISIBLE_TAGS = 'script, style, svg'
+# 腾讯元宝消息节点：用户输入 / AI回复
+_USER_CLASS = 'hyc-component-text'
+_AI_CLASS = 'hyc-component-reasoner__text'
+_MESSAGE_SELECTOR = f'div[class*="{_USER_CLASS}"], div[class*="{_AI_CLASS}"]'
+# 连续空白
+_WS_RE = re.compile(r'\s+')
+# 中文字符（只用于判断是否存在，匹配单个字符即可提前返回）
+_CHINESE_RE = re.compile(r'[\u4e00-\u9fff]')
+# 明显的HTML/CSS/脚本内容特征
+_BLACKLIST = ('stylesheet', 'javascript', 'css-', 'class=', 'href=', 'svg', 'xml')
+# 对话标记关键词
+_USER_KEYWORDS = ('用户提问', '用户问题', '用户需求', '用户确认')
+_AI_KEYWORDS = ('AI回应', 'AI分析', 'AI深度分析')
+_SENDER_BY_KEYWORD = {
+    **dict.fromkeys(_USER_KEYWORDS, 'user'),
+    **dict.fromkeys(_AI_KEYWORDS, 'assistant'),
+}
+_SENDER_KEYWORD_RE = re.compile('|'.join(
+    re.escape(keyword) for keyword in sorted(_SENDER_BY_KEYWORD, key=len, reverse=True)
+))
+# 深度思考耗时
+_THINKING_RE = re.compile(r'已深度思考.*?(\d+秒)')
+# 段落分隔 / 用户消息特征词：一次扫描同时完成分段和发送者判断
+_PARAGRAPH_RE = re.compile(r'(?P<sep>\n\s*\n)|(?P<user>用户|请|帮我|我需要)')
+# 腾讯元宝用户输入内容
+_USER_DIV_RE = re.compile(r'<div[^>]*class="[^"]*' + re.escape(_USER_CLASS) + r'[^"]*"[^>]*>(.*?)</div>', re.DOTALL | re.IGNORECASE)
+# 腾讯元宝AI回复的开始标签（内容可能嵌套，需配合div层级扫描）
+_AI_DIV_RE = re.compile(r'<div[^>]*class="[^"]*' + re.escape(_AI_CLASS) + r'[^"]*"[^>]*>', re.IGNORECASE)
+# div开/闭标签
+_OPEN_DIV_RE = re.compile(r'<div[^>]*>', re.IGNORECASE)
+_CLOSE_DIV_RE = re.compile(r'</div>')
+
+
+def write_json(data, output_path: str) -> None:
+    """将数据以UTF-8、两空格缩进写入JSON文件，安装orjson时直接写出字节"""
+    if _orjson is not None:
+        Path(output_path).write_bytes(_orjson.dumps(data, option=_orjson.OPT_INDENT_2))
+        return
+
+    with open(output_path, 'w', encoding='utf-8', buffering=_IO_BUF) as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class ChatMessage:
     """聊天消息数据类"""
     sender: str  # 发送者 (user/assistant)
     content: str  # 消息内容
     timestamp: Optional[str] = None
+    thinking: Optional[str] = None  # AI思考过程
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class ChatSession:
     """聊天会话数据类"""
     title: str
@@ -38,44 +114,38 @@ class ChatSession:
     messages: List[ChatMessage]
     created_time: Optional[str] = None
 
+    # 按列取出的消息字段（每次访问时由messages计算，不参与序列化），便于统计和过滤
+    @property
+    def senders(self) -> List[str]:
+        """各消息的发送者"""
+        return [msg.sender for msg in self.messages]
+
+    @property
+    def contents(self) -> List[str]:
+        """各消息的内容"""
+        return [msg.content for msg in self.messages]
+
+    @property
+    def thinkings(self) -> List[Optional[str]]:
+        """各消息的思考过程"""
+        return [msg.thinking for msg in self.messages]
+
+    @property
+    def lengths(self) -> array:
+        """各消息的内容长度"""
+        return array('l', [len(msg.content) for msg in self.messages])
+
 
 class MHTMLParser:
     """MHTML文件解析器"""
 
     def __init__(self):
-        self.encoding_patterns = {
-            # URL编码模式 (=E5=A5=BD 格式)
-            'quoted_printable': re.compile(r'=([0-9A-F]{2})', re.IGNORECASE),
-            # HTML实体编码
-            'html_entities': re.compile(r'&[a-zA-Z][a-zA-Z0-9]*;|&#[0-9]+;|&#x[0-9a-fA-F]+;'),
-            # 中文字符模式
-            'chinese_chars': re.compile(r'[\u4e00-\u9fff]+'),
-        }
-
-        # 腾讯元宝聊天内容特征模式
-        self.chat_patterns = {
-            # AI正式回复内容
-            'ai_response': re.compile(r'<div[^>]*class=3D"[^"]*hyc-component-reasoner__text[^"]*"[^>]*>(.*?)</div>', re.DOTALL | re.IGNORECASE),
-            # 用户输入内容
-            'user_input': re.compile(r'<div[^>]*class=3D"[^"]*hyc-component-text[^"]*"[^>]*>(.*?)</div>', re.DOTALL | re.IGNORECASE),
-        }
+        # 解析结果缓存：路径 -> ((修改时间, 文件大小), ChatSession)，按最近使用顺序排列
+        self._parse_cache = OrderedDict()
 
     def decode_quoted_printable(self, text: str) -> str:
         """解码quoted-printable编码的文本"""
-        try:
-            # 使用quopri库解码
-            decoded_bytes = quopri.decodestring(text.encode('ascii'))
-            return decoded_bytes.decode('utf-8', errors='ignore')
-        except Exception:
-            # 手动解码 =XX 格式
-            def replace_hex(match):
-                try:
-                    hex_value = match.group(1)
-                    return chr(int(hex_value, 16))
-                except ValueError:
-                    return match.group(0)
-
-            return self.encoding_patterns['quoted_printable'].sub(replace_hex, text)
+        return quopri.decodestring(text.encode('utf-8')).decode('utf-8', errors='ignore')
 
     def decode_html_entities(self, text: str) -> str:
         """解码HTML实体"""
@@ -84,33 +154,86 @@ class MHTMLParser:
     def clean_html_tags(self, text: str) -> str:
         """清理HTML标签"""
         # 移除HTML标签但保留内容
-        tag_pattern = re.compile(r'<[^>]+>')
-        return tag_pattern.sub('', text)
+        return _TAG_RE.sub('', text)
 
     def extract_text_content(self, html_content: str) -> str:
-        """从HTML内容中提取纯文本"""
-        # 先解码quoted-printable
-        decoded = self.decode_quoted_printable(html_content)
-        # 再解码HTML实体
-        decoded = self.decode_html_entities(decoded)
+        """从HTML内容中提取纯文本（输入为已解码的HTML）"""
+        if _HTMLParser is not None:
+            return self._extract_text_with_parser(html_content)
+
+        # 移除脚本、样式等不可见内容
+        visible = _INVISIBLE_BLOCK_RE.sub('', html_content)
         # 清理HTML标签
-        cleaned = self.clean_html_tags(decoded)
+        cleaned = self.clean_html_tags(visible)
+        # 只对剩余的文本解码HTML实体（解码后的 &lt; 等不会被误当作标签）
+        cleaned = self.decode_html_entities(cleaned)
         # 清理多余空白
-        cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+        cleaned = _WS_RE.sub(' ', cleaned).strip()
         return cleaned
 
-    def parse_mhtml_file(self, file_path: str) -> ChatSession:
-        """解析MHTML文件"""
+    def _extract_text_with_parser(self, html_content: str) -> str:
+        """使用selectolax提取可见文本，标签和HTML实体由解析器处理"""
+        return self._tree_text(self._parse_html_tree(html_content))
+
+    def _parse_html_tree(self, html_content: str):
+        """解析HTML为DOM树，并移除脚本、样式等不可见内容"""
+        tree = _HTMLParser(html_content)
+        for node in tree.css(_INVISIBLE_TAGS):
+            node.decompose()
+        return tree
+
+    def _tree_text(self, tree) -> str:
+        """提取整棵DOM树的可见文本"""
+        root = tree.body or tree.root
+        if root is None:
+            return ""
+        return self._node_text(root)
+
+    def _node_text(self, node) -> str:
+        """提取DOM节点的可见文本"""
+        # 文本节点直接拼接，避免在行内标签处插入空格（与正则路径结果一致）
+        text = node.text(separator='')
+        # 清理多余空白
+        return _WS_RE.sub(' ', text).strip()
+
+    def parse_mhtml_file(self, file_path: str, fresh: bool = False) -> ChatSession:
+        """解析MHTML文件
+
+        结果在当前解析器实例上按 (路径, 修改时间, 文件大小) 缓存（最多32个文件），
+        重复解析未变化的文件会返回同一个ChatSession对象；需要修改返回结果时传入
+        fresh=True 跳过缓存。
+        """
         file_path = Path(file_path)
         if not file_path.exists():
             raise FileNotFoundError(f"文件不存在: {file_path}")
 
-        # 读取文件内容
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-
-        # 解析MIME结构
-        msg = email.message_from_string(content)
+        if fresh:
+            return self._parse_file(file_path)
+
+        # 缓存挂在实例上，子类的配置和重写的方法都会生效；
+        # 同一路径只保留最新一次结果，文件修改时间或大小变化后重新解析
+        cache = self._parse_cache
+        key = str(file_path.resolve())
+        stat = file_path.stat()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        cached = cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            cache.move_to_end(key)
+            return cached[1]
+
+        session = self._parse_file(file_path)
+        cache[key] = (stamp, session)
+        cache.move_to_end(key)
+        # 超出容量时淘汰最久未使用的结果
+        while len(cache) > _PARSE_CACHE_SIZE:
+            cache.popitem(last=False)
+        return session
+
+    def _parse_file(self, file_path: Path) -> ChatSession:
+        """实际解析MHTML文件（不使用缓存）"""
+        # 以二进制流方式解析MIME结构，避免整体读入并做文本解码
+        with open(file_path, 'rb', buffering=_IO_BUF) as f:
+            msg = email.parser.BytesParser(policy=email.policy.default).parse(f)
 
         # 提取基本信息
         session_info = self._extract_session_info(msg)
@@ -131,29 +254,15 @@ class MHTMLParser:
     def _extract_session_info(self, msg: email.message.Message) -> Dict:
         """提取会话基本信息"""
         # 提取标题
+        # policy=default 会自动解码 =?utf-8?Q?...?= 形式的编码标题
         subject = msg.get('Subject', '')
-        if subject:
-            # 处理多行编码的标题
-            import email.header
-            decoded_parts = email.header.decode_header(subject)
-            title_parts = []
-            for part, encoding in decoded_parts:
-                if isinstance(part, bytes):
-                    if encoding:
-                        title_parts.append(part.decode(encoding))
-                    else:
-                        title_parts.append(part.decode('utf-8', errors='ignore'))
-                else:
-                    title_parts.append(part)
-            title = ''.join(title_parts)
-        else:
-            title = "未知对话"
+        title = str(subject) if subject else "未知对话"
 
         # 提取URL
-        url = msg.get('Snapshot-Content-Location', '')
+        url = str(msg.get('Snapshot-Content-Location', ''))
 
         # 提取创建时间
-        date = msg.get('Date', '')
+        date = str(msg.get('Date', ''))
 
         return {
             'title': title,
@@ -162,29 +271,51 @@ class MHTMLParser:
         }
 
     def _extract_html_content(self, msg: email.message.Message) -> str:
-        """提取HTML内容"""
-        html_content = ""
+        """提取HTML内容（已按传输编码和字符集解码）"""
+        html_part = None
 
         if msg.is_multipart():
             for part in msg.walk():
+                # 跳过图片、字体等资源部分，不触碰其负载
+                if part.get_content_maintype() != 'text':
+                    continue
                 if part.get_content_type() == 'text/html':
-                    html_content = part.get_payload()
+                    html_part = part
                     break
         else:
-            html_content = msg.get_payload()
+            # 单部分文件（包括未声明或声明为text/plain的）直接使用其正文
+            html_part = msg
+
+        if html_part is None:
+            return ""
 
-        return html_content
+        # decode=True 会按 Content-Transfer-Encoding 解码 quoted-printable/base64；
+        # 未声明字符集时按UTF-8处理（get_content() 会默认使用us-ascii）
+        payload = html_part.get_payload(decode=True) or b''
+        charset = html_part.get_content_charset() or 'utf-8'
+        try:
+            return payload.decode(charset, errors='ignore')
+        except LookupError:
+            return payload.decode('utf-8', errors='ignore')
 
     def _parse_chat_messages(self, html_content: str) -> List[ChatMessage]:
         """解析聊天消息"""
         messages = []
+        tree = None
 
-        # 使用CSS类名精确提取消息
-        messages = self._extract_by_css_classes(html_content)
+        # 使用CSS类名精确提取消息：有HTML解析器时直接遍历DOM
+        if _HTMLParser is not None:
+            tree = self._parse_html_tree(html_content)
+            messages = self._extract_by_dom(tree)
+        else:
+            messages = self._extract_by_css_classes(html_content)
 
-        # 如果CSS类名方式没有提取到内容，使用备用方法
+        # 如果CSS类名方式没有提取到内容，使用备用方法（复用已解析的DOM树）
         if not messages:
-            decoded_html = self.extract_text_content(html_content)
+            if tree is not None:
+                decoded_html = self._tree_text(tree)
+            else:
+                decoded_html = self.extract_text_content(html_content)
             messages.extend(self._extract_by_patterns(decoded_html))
             messages.extend(self._extract_by_keywords(decoded_html))
 
@@ -193,6 +324,21 @@ class MHTMLParser:
 
         return unique_messages
 
+    def _extract_by_dom(self, tree) -> List[ChatMessage]:
+        """基于DOM结构提取消息，一次遍历按文档顺序得到时间线"""
+        messages = []
+
+        for node in tree.css(_MESSAGE_SELECTOR):
+            # 由节点自身的类名确定发送者
+            classes = node.attributes.get('class') or ''
+            sender = 'assistant' if _AI_CLASS in classes else 'user'
+
+            content = self._node_text(node)
+            if self._is_valid_message(content):
+                messages.append(ChatMessage(sender=sender, content=content))
+
+        return messages
+
     def _extract_by_css_classes(self, html_content: str) -> List[ChatMessage]:
         """基于CSS类名精确提取消息，按时间线排列"""
         messages = []
@@ -201,8 +347,7 @@ class MHTMLParser:
         all_matches = []
 
         # 用户消息 - 保持原有的简单逻辑
-        user_pattern = re.compile(r'<div[^>]*class=3D"[^"]*hyc-component-text[^"]*"[^>]*>(.*?)</div>', re.DOTALL | re.IGNORECASE)
-        for match in user_pattern.finditer(html_content):
+        for match in _USER_DIV_RE.finditer(html_content):
             content = self.extract_text_content(match.group(1))
             if self._is_valid_message(content):
                 all_matches.append({
@@ -212,7 +357,7 @@ class MHTMLParser:
                 })
 
         # AI回复内容 - 使用递归方法提取完整的嵌套内容
-        response_divs = self._extract_nested_div_content(html_content, 'hyc-component-reasoner__text')
+        response_divs = self._extract_nested_div_content(html_content, _AI_DIV_RE)
         for start_pos, full_content in response_divs:
             content = self.extract_text_content(full_content)
             if self._is_valid_message(content):
@@ -234,14 +379,11 @@ class MHTMLParser:
 
         return messages
 
-    def _extract_nested_div_content(self, html_content: str, class_name: str) -> List[Tuple[int, str]]:
-        """提取指定class的div完整内容，包括所有嵌套的子元素"""
+    def _extract_nested_div_content(self, html_content: str, open_pattern: re.Pattern) -> List[Tuple[int, str]]:
+        """提取开始标签匹配open_pattern的div完整内容，包括所有嵌套的子元素"""
         results = []
 
-        # 构建匹配模式
-        pattern = re.compile(r'<div[^>]*class=3D"[^"]*' + re.escape(class_name) + r'[^"]*"[^>]*>', re.IGNORECASE)
-
-        for match in pattern.finditer(html_content):
+        for match in open_pattern.finditer(html_content):
             start_pos = match.start()
             div_start = match.end()
 
@@ -252,8 +394,8 @@ class MHTMLParser:
 
             while nesting_level > 0 and current_pos < len(html_content):
                 # 查找下一个标签
-                open_div_match = re.search(r'<div[^>]*>', html_content[current_pos:], re.IGNORECASE)
-                close_div_match = re.search(r'</div>', html_content[current_pos:])
+                open_div_match = _OPEN_DIV_RE.search(html_content, current_pos)
+                close_div_match = _CLOSE_DIV_RE.search(html_content, current_pos)
 
                 if not open_div_match and not close_div_match:
                     break
@@ -261,15 +403,15 @@ class MHTMLParser:
                 if open_div_match and (not close_div_match or open_div_match.start() < close_div_match.start()):
                     # 找到开标签，增加嵌套层级
                     nesting_level += 1
-                    current_pos += open_div_match.end()
+                    current_pos = open_div_match.end()
                 else:
                     # 找到闭标签，减少嵌套层级
                     nesting_level -= 1
                     if nesting_level == 0:
                         # 找到了匹配的结束标签
-                        content_end = current_pos + close_div_match.start()
+                        content_end = close_div_match.start()
                         break
-                    current_pos += close_div_match.end()
+                    current_pos = close_div_match.end()
 
             # 提取完整的内部内容
             if content_end > div_start:
@@ -283,15 +425,25 @@ class MHTMLParser:
         messages = []
 
         # 查找思考过程
-        thinking_matches = re.findall(r'已深度思考.*?(\d+秒)', content)
+        thinking_match = _THINKING_RE.search(content)
         thinking_content = None
-        if thinking_matches:
-            thinking_content = f"深度思考（用时{thinking_matches[0]}）"
-
-        # 分割对话段落
-        paragraphs = re.split(r'\n\s*\n', content)
+        if thinking_match:
+            thinking_content = f"深度思考（用时{thinking_match.group(1)}）"
+
+        # 分割对话段落，同时记录段落中是否出现用户消息特征词
+        paragraphs = []
+        start = 0
+        has_user_hint = False
+        for match in _PARAGRAPH_RE.finditer(content):
+            if match.lastgroup == 'user':
+                has_user_hint = True
+            else:
+                paragraphs.append((content[start:match.start()], has_user_hint))
+                start = match.end()
+                has_user_hint = False
+        paragraphs.append((content[start:], has_user_hint))
 
-        for paragraph in paragraphs:
+        for paragraph, has_user_hint in paragraphs:
             paragraph = paragraph.strip()
             if len(paragraph) < 10:  # 跳过太短的段落
                 continue
@@ -299,10 +451,7 @@ class MHTMLParser:
             # 检测是否为有效对话内容
             if self._is_valid_message(paragraph):
                 # 简单启发式判断发送者
-                if any(keyword in paragraph for keyword in ['用户', '请', '帮我', '我需要']):
-                    sender = 'user'
-                else:
-                    sender = 'assistant'
+                sender = 'user' if has_user_hint else 'assistant'
 
                 messages.append(ChatMessage(
                     sender=sender,
@@ -316,48 +465,29 @@ class MHTMLParser:
         """基于关键词提取消息"""
         messages = []
 
-        # 查找特定的对话标记
-        user_keywords = ['用户提问', '用户问题', '用户需求', '用户确认']
-        assistant_keywords = ['AI回应', 'AI分析', 'AI深度分析']
+        # 一次扫描定位所有对话标记，记录每个标记行的起始位置和发送者
+        # （同一行同时出现两类标记时以用户为准）
+        line_senders = {}
+        for match in _SENDER_KEYWORD_RE.finditer(content):
+            line_start = content.rfind('\n', 0, match.start()) + 1
+            if line_senders.get(line_start) != 'user':
+                line_senders[line_start] = _SENDER_BY_KEYWORD[match.group()]
 
-        lines = content.split('\n')
-        current_message = []
+        # 只在发送者切换处分段
+        boundaries = []
         current_sender = None
-
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            # 检测发送者切换
-            new_sender = None
-            if any(keyword in line for keyword in user_keywords):
-                new_sender = 'user'
-            elif any(keyword in line for keyword in assistant_keywords):
-                new_sender = 'assistant'
-
-            if new_sender and new_sender != current_sender:
-                # 保存之前的消息
-                if current_message and current_sender:
-                    content_text = '\n'.join(current_message).strip()
-                    if self._is_valid_message(content_text):
-                        messages.append(ChatMessage(
-                            sender=current_sender,
-                            content=content_text
-                        ))
-
-                # 开始新消息
-                current_sender = new_sender
-                current_message = [line]
-            else:
-                current_message.append(line)
-
-        # 处理最后一条消息
-        if current_message and current_sender:
-            content_text = '\n'.join(current_message).strip()
+        for line_start, sender in line_senders.items():
+            if sender != current_sender:
+                boundaries.append((line_start, sender))
+                current_sender = sender
+
+        for i, (start, sender) in enumerate(boundaries):
+            end = boundaries[i + 1][0] if i + 1 < len(boundaries) else len(content)
+            lines = (line.strip() for line in content[start:end].split('\n'))
+            content_text = '\n'.join(line for line in lines if line)
             if self._is_valid_message(content_text):
                 messages.append(ChatMessage(
-                    sender=current_sender,
+                    sender=sender,
                     content=content_text
                 ))
 
@@ -366,17 +496,17 @@ class MHTMLParser:
     def _is_valid_message(self, text: str) -> bool:
         """判断是否为有效的聊天消息"""
         # 长度检查
-        if len(text) < 5 or len(text) > 10000:
+        length = len(text)
+        if length < 5 or length > 10000:
             return False
 
         # 包含中文字符
-        if not self.encoding_patterns['chinese_chars'].search(text):
+        if not _CHINESE_RE.search(text):
             return False
 
-        # 排除明显的HTML/CSS内容
-        if any(keyword in text.lower() for keyword in [
-            'stylesheet', 'javascript', 'css-', 'class=', 'href=', 'svg', 'xml'
-        ]):
+        # 排除明显的HTML/CSS内容（只转换一次小写）
+        lowered = text.lower()
+        if any(keyword in lowered for keyword in _BLACKLIST):
             return False
 
         return True
@@ -387,8 +517,8 @@ class MHTMLParser:
         unique_messages = []
 
         for msg in messages:
-            # 使用内容的前100个字符作为去重键
-            key = msg.content[:100]
+            # 使用内容前100个字符的哈希值作为去重键，集合中只保留整数而非子串
+            key = hash(msg.content[:100])
             if key not in seen:
                 seen.add(key)
                 unique_messages.append(msg)
@@ -400,7 +530,7 @@ class MHTMLParser:
         if output_path is None:
             output_path = f"chat_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
 
-        markdown_content = f"""# {session.title}
+        header = f"""# {session.title}
 
 **来源**: {session.url}
 **创建时间**: {session.created_time}
@@ -410,15 +540,18 @@ class MHTMLParser:
 
 """
 
-        for i, msg in enumerate(session.messages, 1):
-            sender_label = "🧑 用户" if msg.sender == 'user' else "🤖 AI助手"
+        # 逐段写入文件，避免反复拼接大字符串
+        with open(output_path, 'w', encoding='utf-8', buffering=_IO_BUF) as f:
+            write = f.write
+            write(header)
 
-            markdown_content += f"## {i}. {sender_label}\n\n"
-            markdown_content += f"{msg.content}\n\n---\n\n"
+            for i, msg in enumerate(session.messages, 1):
+                sender_label = "🧑 用户" if msg.sender == 'user' else "🤖 AI助手"
 
-        # 写入文件
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(markdown_content)
+                write(f"## {i}. {sender_label}\n\n")
+                if msg.thinking:
+                    write(f"> 💭 {msg.thinking}\n\n")
+                write(f"{msg.content}\n\n---\n\n")
 
         return output_path
 
@@ -436,14 +569,14 @@ class MHTMLParser:
                 {
                     'sender': msg.sender,
                     'content': msg.content,
-                    'timestamp': msg.timestamp
+                    'timestamp': msg.timestamp,
+                    'thinking': msg.thinking
                 }
                 for msg in session.messages
             ]
         }
 
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(session_dict, f, ensure_ascii=False, indent=2)
+        write_json(session_dict, output_path)
 
         return output_path
 
@@ -5,10 +5,13 @@ MHTML解析器测试文件
 用于测试和验证解析器功能
 """
 
+import dataclasses
 import unittest
 import tempfile
 import os
 from pathlib import Path
+from unittest import mock
+import mhtml_parser
 from mhtml_parser import MHTMLParser, ChatMessage, ChatSession
 
 
@@ -51,11 +54,28 @@ class TestMHTMLParser(unittest.TestCase):
 
     def test_extract_text_content(self):
         """测试文本内容提取"""
-        html_content = "<div>=E4=BD=A0=E5=A5=BD &lt;World&gt;</div>"
+        html_content = "<div>你好 &lt;World&gt;</div>"
         extracted = self.parser.extract_text_content(html_content)
         self.assertIn("你好", extracted)
         self.assertIn("<World>", extracted)
 
+        # 脚本和样式内容不应出现在提取结果中
+        html_content = "<style>.a{color:red}</style><div>你好</div><script>var x = 1;</script>"
+        self.assertEqual(self.parser.extract_text_content(html_content), "你好")
+
+    def test_extract_text_inline_tags(self):
+        """测试行内标签不会拆开文本，且两种提取路径结果一致"""
+        cases = {
+            "<p>这是<strong>重要</strong>的内容</p>": "这是重要的内容",
+            "a<b>b</b>c": "abc",
+        }
+        for html_content, expected in cases.items():
+            self.assertEqual(self.parser.extract_text_content(html_content), expected)
+
+            # 未安装selectolax时的正则路径
+            with mock.patch('mhtml_parser._HTMLParser', None):
+                self.assertEqual(self.parser.extract_text_content(html_content), expected)
+
     def test_is_valid_message(self):
         """测试消息有效性判断"""
         # 有效消息
@@ -74,6 +94,72 @@ class TestMHTMLParser(unittest.TestCase):
         invalid_html = "这是包含CSS的消息 class='test' stylesheet"
         self.assertFalse(self.parser._is_valid_message(invalid_html))
 
+    def test_extract_by_keywords(self):
+        """测试基于关键词提取消息"""
+        # 发送者切换处分段，标记行之后的内容归入当前消息
+        content = "用户提问：如何设计游戏\nAI回应：可以从核心玩法开始\n  补充说明的内容  \n"
+        messages = self.parser._extract_by_keywords(content)
+        self.assertEqual([msg.sender for msg in messages], ["user", "assistant"])
+        self.assertEqual(messages[0].content, "用户提问：如何设计游戏")
+        self.assertEqual(messages[1].content, "AI回应：可以从核心玩法开始\n补充说明的内容")
+
+        # 第一个标记之前的内容被丢弃
+        content = "前言部分的中文内容\n用户提问：如何设计游戏"
+        messages = self.parser._extract_by_keywords(content)
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(messages[0].content, "用户提问：如何设计游戏")
+
+        # 连续的同一发送者标记合并为一条消息
+        content = "用户提问：第一个问题\n\n用户确认：第二个问题"
+        messages = self.parser._extract_by_keywords(content)
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(messages[0].content, "用户提问：第一个问题\n用户确认：第二个问题")
+
+        # 同一行同时出现两类标记时以用户为准
+        content = "AI分析之后的用户问题是什么\nAI回应：这是回答内容"
+        messages = self.parser._extract_by_keywords(content)
+        self.assertEqual([msg.sender for msg in messages], ["user", "assistant"])
+        self.assertEqual(messages[0].content, "AI分析之后的用户问题是什么")
+
+    def test_extract_by_patterns(self):
+        """测试基于模式匹配提取消息"""
+        content = (
+            "请帮我设计一个有趣的小游戏吧\n"
+            "  \n"
+            "好的，这是一个关于探险的游戏设计方案\n\n"
+            "太短的段落\n\n"
+            "已深度思考（用时12秒）"
+        )
+        messages = self.parser._extract_by_patterns(content)
+
+        # 空行分段，短于10个字符的段落被跳过
+        self.assertEqual(len(messages), 3)
+
+        # 含用户特征词的段落判定为用户，其余为AI
+        self.assertEqual(messages[0].sender, "user")
+        self.assertEqual(messages[0].content, "请帮我设计一个有趣的小游戏吧")
+        self.assertIsNone(messages[0].thinking)
+
+        # AI消息附带深度思考信息
+        self.assertEqual(messages[1].sender, "assistant")
+        self.assertEqual(messages[1].content, "好的，这是一个关于探险的游戏设计方案")
+        self.assertEqual(messages[1].thinking, "深度思考（用时12秒）")
+
+    @unittest.skipUnless(mhtml_parser._HTMLParser, "需要安装selectolax")
+    def test_extract_by_dom(self):
+        """测试基于DOM结构提取消息"""
+        html_content = (
+            '<div class="hyc-component-text">用户问题：帮我设计一个游戏</div>'
+            '<div class="hyc-component-reasoner__text"><div><p>好的，这是<strong>游戏</strong>设计方案</p>'
+            '<svg><text>图标</text></svg></div></div>'
+        )
+        tree = self.parser._parse_html_tree(html_content)
+        messages = self.parser._extract_by_dom(tree)
+
+        self.assertEqual([msg.sender for msg in messages], ["user", "assistant"])
+        # 行内标签不应拆开文本
+        self.assertEqual(messages[1].content, "好的，这是游戏设计方案")
+
     def test_deduplicate_messages(self):
         """测试消息去重"""
         messages = [
@@ -118,6 +204,29 @@ class TestMHTMLParser(unittest.TestCase):
         self.assertEqual(len(session.messages), 2)
         self.assertEqual(session.messages[1].thinking, "思考过程")
 
+    def test_chat_session_columns(self):
+        """测试ChatSession按列字段"""
+        messages = [
+            ChatMessage("user", "用户消息"),
+            ChatMessage("assistant", "AI的回复内容", thinking="思考过程")
+        ]
+
+        session = ChatSession(title="测试对话", url="https://example.com", messages=messages)
+
+        self.assertEqual(session.senders, ["user", "assistant"])
+        self.assertEqual(session.contents, ["用户消息", "AI的回复内容"])
+        self.assertEqual(session.thinkings, [None, "思考过程"])
+        self.assertEqual(list(session.lengths), [4, 7])
+
+        # 按列字段随messages变化，且不属于dataclass字段
+        session.messages.append(ChatMessage("user", "追加的消息"))
+        self.assertEqual(session.senders, ["user", "assistant", "user"])
+        self.assertEqual(list(session.lengths), [4, 7, 5])
+        self.assertEqual(
+            sorted(dataclasses.asdict(session)),
+            ["created_time", "messages", "title", "url"]
+        )
+
     def test_export_markdown(self):
         """测试Markdown导出"""
         messages = [
@@ -247,6 +356,95 @@ AI=E5=9B=9E=E7=AD=94=EF=BC=9A=E4=BD=A0=E5=A5=BD=EF=BC=8C=E6=88=91=E6=98=AFAI=E5=
             if os.path.exists(temp_path):
                 os.unlink(temp_path)
 
+    def test_parse_single_part_file(self):
+        """测试解析未声明Content-Type的单部分文件"""
+        content = (
+            "Subject: =?utf-8?Q?=E6=B5=8B=E8=AF=95=E5=AF=B9=E8=AF=9D?=\n"
+            "Content-Transfer-Encoding: quoted-printable\n"
+            "\n"
+            "=E7=94=A8=E6=88=B7=E9=97=AE=E9=A2=98=EF=BC=9A=E8=AF=B7=E5=B8=AE=E6=88=91=E8=AE=BE=E8=AE=A1=E6=B8=B8=E6=88=8F\n"
+        )
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.mhtml', delete=False, encoding='utf-8') as f:
+            f.write(content)
+            temp_path = f.name
+
+        try:
+            session = self.parser.parse_mhtml_file(temp_path)
+            self.assertEqual(session.title, "测试对话")
+            self.assertEqual(len(session.messages), 1)
+            self.assertEqual(session.messages[0].sender, "user")
+            self.assertIn("请帮我设计游戏", session.messages[0].content)
+
+        finally:
+            # 清理临时文件
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+    def test_parse_mhtml_cache(self):
+        """测试解析结果缓存"""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.mhtml', delete=False, encoding='utf-8') as f:
+            f.write(self.create_test_mhtml_content())
+            temp_path = f.name
+
+        try:
+            first = self.parser.parse_mhtml_file(temp_path)
+
+            # 文件未变化时返回缓存的同一对象
+            self.assertIs(self.parser.parse_mhtml_file(temp_path), first)
+
+            # 缓存属于实例，其他实例独立解析
+            self.assertIsNot(MHTMLParser().parse_mhtml_file(temp_path), first)
+
+            # fresh=True 跳过缓存
+            self.assertIsNot(self.parser.parse_mhtml_file(temp_path, fresh=True), first)
+
+            # 文件变化后缓存失效
+            with open(temp_path, 'a', encoding='utf-8') as f:
+                f.write("\n")
+            self.assertIsNot(self.parser.parse_mhtml_file(temp_path), first)
+
+            # 超出容量时淘汰最久未使用的结果
+            with tempfile.NamedTemporaryFile(mode='w', suffix='.mhtml', delete=False, encoding='utf-8') as f:
+                f.write(self.create_test_mhtml_content())
+                other_path = f.name
+            try:
+                with mock.patch('mhtml_parser._PARSE_CACHE_SIZE', 1):
+                    self.parser.parse_mhtml_file(other_path)
+                self.assertEqual(list(self.parser._parse_cache), [str(Path(other_path).resolve())])
+            finally:
+                os.unlink(other_path)
+
+        finally:
+            # 清理临时文件
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+    def test_parse_mhtml_cache_configured_subclass(self):
+        """测试带配置的子类实例不会共享缓存结果"""
+        class MinLengthParser(MHTMLParser):
+            def __init__(self, min_length):
+                super().__init__()
+                self.min_length = min_length
+
+            def _is_valid_message(self, text):
+                return len(text) >= self.min_length and super()._is_valid_message(text)
+
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.mhtml', delete=False, encoding='utf-8') as f:
+            f.write(self.create_test_mhtml_content())
+            temp_path = f.name
+
+        try:
+            lenient = MinLengthParser(0).parse_mhtml_file(temp_path)
+            strict = MinLengthParser(100).parse_mhtml_file(temp_path)
+
+            self.assertGreater(len(lenient.messages), 0)
+            self.assertEqual(len(strict.messages), 0)
+
+        finally:
+            # 清理临时文件
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+
 
 def run_basic_tests():
     """运行基础功能测试"""
@@ -261,14 +459,22 @@ def run_basic_tests():
         'test_decode_html_entities',
         'test_clean_html_tags',
         'test_extract_text_content',
+        'test_extract_text_inline_tags',
         'test_is_valid_message',
+        'test_extract_by_keywords',
+        'test_extract_by_patterns',
+        'test_extract_by_dom',
         'test_deduplicate_messages',
         'test_chat_message_creation',
         'test_chat_session_creation',
+        'test_chat_session_columns',
         'test_export_markdown',
         'test_export_json',
         'test_parse_nonexistent_file',
-        'test_parse_mhtml_content'
+        'test_parse_mhtml_content',
+        'test_parse_single_part_file',
+        'test_parse_mhtml_cache',
+        'test_parse_mhtml_cache_configured_subclass'
     ]
 
     for method in test_methods: